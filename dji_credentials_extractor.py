@@ -22,23 +22,178 @@ Usage:
     python3 dji_credentials_extractor.py
 """
 
+import argparse
 import os
+import shlex
 import shutil
+import signal
 import sys
 import subprocess
+import threading
 import time
 import re
+import select
+import selectors
 import json
+import logging
+import math
+import hashlib
+import importlib.util
+import urllib.request
+import xml.etree.ElementTree as ET
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing
+from functools import lru_cache
 from pathlib import Path
+from string import Template
 from datetime import datetime
 
+try:
+    import hyperscan  # Optional: much faster multi-pattern scan
+except ImportError:
+    hyperscan = None
+
+try:
+    import re2  # Optional (google-re2): linear-time scan when Hyperscan is missing
+except ImportError:
+    re2 = None
+
 # Configuration
 SCRIPT_DIR = Path(__file__).parent
 APK_NAME = "com.dji.home.apk"
 AVD_NAME = "dji_extractor"
 SYSTEM_IMAGE = "system-images;android-34;google_apis;arm64-v8a"
+SYS_IMG_REPOSITORY = "https://dl.google.com/android/repository/sys-img/google_apis/"
 OUTPUT_FILE = SCRIPT_DIR / "dji_credentials.txt"
 ENV_FILE = SCRIPT_DIR / ".env"
+AVD_HOME = Path.home() / ".android/avd"
+SNAPSHOT_NAME = "dji_ready"
+# The window stays on: the user logs in through it
+EMULATOR_FLAGS = [
+    "-no-audio",
+    "-no-boot-anim",
+    "-netfast",
+    "-camera-back", "none",
+    "-camera-front", "none",
+]
+# AVD hardware settings: enough RAM for the app and room to install it
+AVD_CONFIG = {
+    "hw.ramSize": "4096",
+    "vm.heapSize": "512",
+    "disk.dataPartition.size": "4096M",
+    "hw.gpu.enabled": "yes",
+    "hw.gpu.mode": "auto",
+}
+CACHE_DIR = Path.home() / ".cache/dji_extractor"
+SDK_CACHE = CACHE_DIR / "cache.tzst"
+EMULATOR_PID_FILE = CACHE_DIR / "emulator.pid"
+STATE_FILE = CACHE_DIR / "state.json"
+APK_HASH_MARKER = "/data/local/tmp/.apk_hash_com.dji.home"
+# Flutter shared preferences of the app; the user id is stored there once logged in
+APP_PREFS = "/data/data/com.dji.home/shared_prefs/FlutterSharedPreferences.xml"
+LOGIN_POLL_INTERVAL = 2
+LOGIN_TIMEOUT = 600
+LOGIN_MAX_FAILURES = 5  # consecutive checks without a device answer
+LOGIN_SETTLE = 5  # let the main screen load the device list after an automatic continue
+
+# Credential patterns, matched in a single pass over the raw memory dump.
+# Every value is printable ASCII by construction, so the raw bytes are matched
+# directly without a strings pass. SharedPreferences values (flutter.*) are
+# stored right after their key, so they are matched within a short window.
+VALUE_GAP = rb"[\x00-\xff]{0,64}?"
+
+# field -> (context the value must follow, value pattern)
+FIELDS = {
+    "user_token": (b"", rb"US_[A-Za-z0-9_-]{50,}"),
+    "user_name": (b"", rb"djiuser_[A-Za-z0-9_]+"),
+    "pair_uuid": (b"", rb"ROMO-[A-Z0-9]+"),
+    "iot_url": (b"", rb"things-access[a-z0-9.-]*\.iot\.djigate\.com"),
+    "user_id": (rb"flutter\.user_id" + VALUE_GAP, rb"[0-9]{15,}"),
+    "user_email": (rb"flutter\.user_email" + VALUE_GAP, rb"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"),
+    "device_uuid": (rb"flutter\._deviceUUIDKey" + VALUE_GAP, rb"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"),
+    "device_sn": (rb'"(?:sn|device_sn)":"', rb'[A-Z0-9]{10,}(?=")'),
+    "sn_candidate": (b"", rb"[0-9][A-Z]{3,4}[A-Z0-9]{8,}"),
+}
+EXPRESSIONS = {
+    field: context + b"(?P<" + field.encode() + b">" + value + b")"
+    for field, (context, value) in FIELDS.items()
+}
+PATTERN = re.compile(b"|".join(EXPRESSIONS.values()), re.ASCII)
+
+# Literal prefixes of the patterns above, used to run the regex only where
+# a credential can start. sn_candidate has none and is scanned separately.
+ANCHORS = (
+    b"US_",
+    b"djiuser_",
+    b"ROMO-",
+    b"things-access",
+    b"flutter.user_id",
+    b"flutter.user_email",
+    b"flutter._deviceUUIDKey",
+    b'"sn":"',
+    b'"device_sn":"',
+)
+# sn_candidate has no anchor and is matched over the whole dump, so it uses
+# RE2 when available (value only: RE2 reports bytes group names)
+SN_CANDIDATE = (re2.compile if re2 is not None else re.compile)(FIELDS["sn_candidate"][1])
+SCAN_FIELDS = set(FIELDS) - {"sn_candidate"}
+
+# Private read-write heap mappings in /proc/<pid>/maps where the Dart/Java
+# objects live (code, read-only data and shared buffers are skipped)
+HEAP_REGION = re.compile(
+    r"^([0-9a-f]+)-([0-9a-f]+) rw-p \S+ \S+ \S+\s+"
+    r"(\[anon:(?:dalvik|libc_malloc|scudo|dart)[^\]]*\]|\[heap\])$"
+)
+
+# The dump is scanned as it streams in: chunk size, overlap kept between
+# chunks so a credential split across them is still matched, and timeout
+DUMP_CHUNK = 16 << 20
+DUMP_OVERLAP = 4096
+DUMP_TIMEOUT = 300
+# dd block size cap, and length cap of one `adb exec-out` command
+# (the kernel refuses single arguments over 128KB with E2BIG)
+DUMP_BLOCK_MAX = 1 << 20
+DUMP_COMMAND_MAX = 32 << 10
+
+# Dump windows are scanned in parallel, one per CPU core
+SCAN_WORKERS = os.cpu_count() or 1
+
+# One "=== KEY ===" header line followed by its output, up to the next header
+SECTION = re.compile(r"^=== ([A-Z_]+) ===[ \t\r]*\n(.*?)(?=^=== [A-Z_]+ ===|\Z)", re.MULTILINE | re.DOTALL)
+
+# Emulator serials (console port, state) in `adb devices` output; consoles use even ports from 5554
+EMULATOR_SERIAL = re.compile(r"^emulator-(\d+)\s+(\S+)", re.MULTILINE)
+EMULATOR_PORTS = range(5554, 5586, 2)
+
+# Root check, PID and memory maps of the app, fetched in one adb round trip
+PROBE_SCRIPT = """
+echo "=== WHOAMI ==="; whoami
+echo "=== PID ==="; pidof com.dji.home
+echo "=== MAPS ==="; pid=$(pidof com.dji.home) && cat /proc/${pid%% *}/maps
+"""
+
+# versionCode in `aapt dump badging` (local APK) and `dumpsys package` (installed app) output
+APK_VERSION = re.compile(r"versionCode='(\d+)'")
+INSTALLED_VERSION = re.compile(r"versionCode=(\d+)")
+
+# Launch duration reported by `am start -W`
+LAUNCH_TIME = re.compile(r"TotalTime: (\d+)")
+
+# Command timeouts (seconds): short queries, package installs, SDK downloads
+COMMAND_TIMEOUT = 30
+INSTALL_TIMEOUT = 600
+DOWNLOAD_TIMEOUT = 1800
+HOMEBREW_TIMEOUT = 1200
+
+# Prints the JDK that the macOS /usr/bin/java stub runs
+MACOS_JAVA_HOME = "/usr/libexec/java_home"
+
+HOMEBREW_INSTALLER = "https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh"
+
+# DJI API: shared HTTP session (created on first use) and (connect, read) timeouts
+API_TIMEOUT = (5, 30)
+_SESSION = None
 
 # Colors for terminal
 class Colors:
@@ -52,50 +207,234 @@ class Colors:
     BOLD = '\033[1m'
 
 
+# No escape codes when the output is not a terminal (CI logs, redirects) or NO_COLOR is set
+if not sys.stdout.isatty() or "NO_COLOR" in os.environ:
+    for name in [n for n in vars(Colors) if n.isupper()]:
+        setattr(Colors, name, "")
+
+# All print_* helpers go through one logger and its stdout handler
+log = logging.getLogger("dji_extractor")
+log.setLevel(logging.INFO)
+log.propagate = False
+_handler = logging.StreamHandler(sys.stdout)
+_handler.setFormatter(logging.Formatter("%(message)s"))
+log.addHandler(_handler)
+
+
 def print_header(text):
-    print(f"\n{Colors.HEADER}{Colors.BOLD}{'='*60}{Colors.END}")
-    print(f"{Colors.HEADER}{Colors.BOLD}{text.center(60)}{Colors.END}")
-    print(f"{Colors.HEADER}{Colors.BOLD}{'='*60}{Colors.END}\n")
+    rule = f"{Colors.HEADER}{Colors.BOLD}{'='*60}{Colors.END}"
+    log.info(f"\n{rule}\n{Colors.HEADER}{Colors.BOLD}{text.center(60)}{Colors.END}\n{rule}\n")
 
 
 def print_step(step, text):
-    print(f"{Colors.CYAN}[{step}]{Colors.END} {text}")
+    log.info(f"{Colors.CYAN}[{step}]{Colors.END} {text}")
 
 
 def print_success(text):
-    print(f"{Colors.GREEN}[✓]{Colors.END} {text}")
+    log.info(f"{Colors.GREEN}[✓]{Colors.END} {text}")
 
 
 def print_error(text):
-    print(f"{Colors.FAIL}[✗]{Colors.END} {text}")
+    log.error(f"{Colors.FAIL}[✗]{Colors.END} {text}")
 
 
 def print_warning(text):
-    print(f"{Colors.WARNING}[!]{Colors.END} {text}")
+    log.warning(f"{Colors.WARNING}[!]{Colors.END} {text}")
 
 
 def print_info(text):
-    print(f"{Colors.BLUE}[i]{Colors.END} {text}")
+    log.info(f"{Colors.BLUE}[i]{Colors.END} {text}")
+
 
+def run_command(cmd, check=True, capture=True, timeout=COMMAND_TIMEOUT, input=None, merge_stderr=False, verbose=False):
+    """Execute a command given as an argv list, or as a string split like a shell would.
 
-def run_command(cmd, check=True, capture=True, timeout=None):
-    """Execute a shell command."""
+    No shell is started: pass answers to prompts with input= instead of piping.
+    With verbose=True the output is also echoed to the terminal as it arrives.
+    """
+    argv = shlex.split(cmd) if isinstance(cmd, str) else cmd
     try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            check=check,
-            capture_output=capture,
-            text=True,
-            timeout=timeout
+        proc = subprocess.Popen(
+            argv,
+            stdin=subprocess.PIPE if input is not None else None,
+            stdout=subprocess.PIPE if capture else None,
+            stderr=subprocess.STDOUT if merge_stderr else (subprocess.PIPE if capture else None),
         )
-        return result.stdout.strip() if capture else None
-    except subprocess.CalledProcessError as e:
+    except FileNotFoundError:
+        # Same outcome a shell reports for a missing program
         if check:
-            raise
+            raise subprocess.CalledProcessError(127, argv)
         return None
+
+    if input is not None:
+        try:
+            proc.stdin.write(input.encode())
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass  # exited without reading its answers
+
+    output = _read_output(proc, timeout, verbose)
+    if output is None:
+        print_warning(f"Command timed out after {timeout}s: {shlex.join(map(str, argv))}")
+        return None
+
+    if check and proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, argv, output=output)
+    return output.strip() if capture else None
+
+
+def _read_output(proc, timeout, verbose):
+    """Read proc's stdout/stderr as they become readable until it exits.
+
+    Return the stdout text, or None (after killing proc) on timeout.
+    """
+    deadline = time.monotonic() + timeout
+    stdout = []
+    selector = selectors.DefaultSelector()
+    for stream in (proc.stdout, proc.stderr):
+        if stream is not None:
+            selector.register(stream, selectors.EVENT_READ)
+
+    try:
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            for key, _ in selector.select(remaining):
+                data = os.read(key.fd, 65536)
+                if not data:
+                    selector.unregister(key.fileobj)
+                    continue
+                if key.fileobj is proc.stdout:
+                    stdout.append(data)
+                if verbose:
+                    sys.stdout.buffer.write(data)
+                    sys.stdout.flush()
+        proc.wait(timeout=max(deadline - time.monotonic(), 0))
     except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
         return None
+    finally:
+        selector.close()
+        for stream in (proc.stdout, proc.stderr):
+            if stream is not None:
+                stream.close()
+
+    return b"".join(stdout).decode(errors="replace")
+
+
+class AdbShell:
+    """One long-lived `adb shell` that device commands are sent to, instead of a new adb connection each."""
+
+    SENTINEL = "__DJI_EXTRACTOR_END__"
+
+    def __init__(self):
+        self.proc = None
+        self.lock = threading.Lock()
+
+    def close(self):
+        """Stop the shell; the next send() starts a new one (e.g. after adbd restarts)."""
+        if self.proc is not None:
+            if self.proc.poll() is None:
+                self.proc.kill()
+            self.proc.wait()
+            self.proc = None
+
+    def send(self, cmd, timeout=COMMAND_TIMEOUT):
+        """Run cmd in the device shell. Return (output, exit code), or (None, None) on failure."""
+        with self.lock:
+            for _ in range(2):  # retry once with a fresh shell if the old one died
+                if self.proc is None or self.proc.poll() is not None:
+                    self.close()
+                    self.proc = subprocess.Popen(
+                        ["adb", "shell"],
+                        stdin=subprocess.PIPE,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.DEVNULL,
+                    )
+                try:
+                    self.proc.stdin.write(f"{cmd}\necho {self.SENTINEL}$?\n".encode())
+                    self.proc.stdin.flush()
+                except BrokenPipeError:
+                    self.close()
+                    continue
+
+                result = self._read_until_sentinel(timeout)
+                if result is not None:
+                    return result
+                if self.proc is not None:
+                    # Timed out: the shell is still busy with cmd, so it cannot be reused
+                    print_warning(f"Command timed out after {timeout}s: adb shell {cmd.strip()}")
+                    self.close()
+                    return None, None
+            return None, None
+
+    def _read_until_sentinel(self, timeout):
+        fd = self.proc.stdout.fileno()
+        marker = self.SENTINEL.encode()
+        deadline = time.monotonic() + timeout
+        output = b""
+        while True:
+            end = output.find(marker)
+            if end != -1 and b"\n" in output[end:]:
+                status = output[end + len(marker):].split(b"\n", 1)[0].strip()
+                return output[:end].decode(errors="replace").strip(), int(status or -1)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                return None
+            data = os.read(fd, 65536)
+            if not data:
+                self.close()  # shell exited (no device, adbd restarted)
+                return None
+            output += data
+
+
+ADB_SHELL = AdbShell()
+
+
+@lru_cache(maxsize=128)
+def _adb_cached(cmd, bucket):
+    if cmd.startswith("adb shell "):
+        return ADB_SHELL.send(cmd[len("adb shell "):])[0]
+    return run_command(cmd, check=False)
+
+
+def adb_query(cmd):
+    """Run a read-only adb status query, reusing results within the same second."""
+    return _adb_cached(cmd, int(time.time()))
+
+
+def _wait_until(predicate, timeout, interval=0.25):
+    """Poll predicate until it returns something truthy or timeout expires; return its last result."""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = predicate()
+        if result or time.monotonic() >= deadline:
+            return result
+        time.sleep(interval)
+
+
+def _app_pid():
+    """Return the PID(s) of the running DJI Home app, or an empty string."""
+    return ADB_SHELL.send("pidof com.dji.home")[0]
+
+
+def _app_in_foreground():
+    """Return True if a DJI Home activity is the resumed (on-screen) one."""
+    activities = ADB_SHELL.send("dumpsys activity activities | grep -E 'mResumedActivity|topResumedActivity'")[0]
+    return "com.dji.home/" in (activities or "")
+
+
+def enable_root():
+    """Restart adbd as root and wait for a root shell. Return True if the shell is root."""
+    output = run_command("adb root", check=False) or ""
+    _adb_cached.cache_clear()  # adbd restarted, earlier answers are stale
+    ADB_SHELL.close()
+    if "cannot run as root" in output:
+        return False
+    return _wait_until(lambda: "root" in (ADB_SHELL.send("whoami")[0] or ""), 10)
 
 
 def _sdk_has_emulator(android_home):
@@ -112,20 +451,183 @@ def _sdk_has_system_image(android_home):
     return Path(f"{android_home}/system-images/android-34/google_apis/arm64-v8a").is_dir()
 
 
+def _has_snapshot():
+    """Return True if the booted-state snapshot of the AVD exists."""
+    return (AVD_HOME / f"{AVD_NAME}.avd" / "snapshots" / SNAPSHOT_NAME).is_dir()
+
+
+def load_state():
+    """Return the state recorded by previous runs (installed SDK components, APK hash)."""
+    try:
+        return json.loads(STATE_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(**updates):
+    """Merge updates into the state file."""
+    state = load_state()
+    state.update(updates)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    STATE_FILE.write_text(json.dumps(state, indent=2))
+
+
+def restore_cache(android_home):
+    """Restore the system image from the cache tarball if it is missing."""
+    if _sdk_has_system_image(android_home) or not SDK_CACHE.exists() or not shutil.which("zstd"):
+        return False
+
+    print_info(f"Restoring system image from {SDK_CACHE}...")
+    run_command(["tar", "--use-compress-program=zstd", "-xf", SDK_CACHE, "-C", android_home, "system-images"],
+                check=False, timeout=INSTALL_TIMEOUT)
+    return True
+
+
+def save_cache(android_home):
+    """Save the system image into the cache tarball, once."""
+    if SDK_CACHE.exists() or not shutil.which("zstd"):
+        return False
+
+    # The image never changes once installed, and it is the part that is slow
+    # to download; the AVD is recreated in seconds
+    print_info(f"Caching system image in {SDK_CACHE} (this may take a few minutes)...")
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_cache = SDK_CACHE.with_suffix(".tmp")
+    # check=False would return tar's output even when it fails
+    try:
+        result = run_command(
+            [
+                "tar", "--use-compress-program=zstd", "-cf", tmp_cache,
+                "-C", android_home, "system-images/android-34/google_apis/arm64-v8a",
+            ],
+            timeout=INSTALL_TIMEOUT,
+        )
+    except subprocess.CalledProcessError:
+        result = None
+    if result is None:
+        tmp_cache.unlink(missing_ok=True)
+        print_warning("Could not create the system image cache")
+        return False
+
+    tmp_cache.rename(SDK_CACHE)
+    print_success("System image cached for the next run")
+    return True
+
+
+def preseed_system_image(android_home):
+    """Pre-download the system image with aria2c so sdkmanager skips its slow download."""
+    if _sdk_has_system_image(android_home) or not shutil.which("aria2c"):
+        return False
+
+    # Find the archive for this host in the system image repository
+    try:
+        with urllib.request.urlopen(SYS_IMG_REPOSITORY + "sys-img2-3.xml", timeout=30) as response:
+            repository = ET.fromstring(response.read())
+    except (OSError, ET.ParseError) as e:
+        print_warning(f"Could not read the system image repository: {e}")
+        return False
+
+    host_os = "macosx" if sys.platform == "darwin" else "linux"
+    archive = None
+    for package in repository.iter("remotePackage"):
+        if package.get("path") == SYSTEM_IMAGE:
+            archive = next(
+                (a for a in package.iter("archive") if a.findtext("host-os") in (None, host_os)),
+                None,
+            )
+            break
+    if archive is None or not archive.findtext("complete/url"):
+        return False
+
+    # sdkmanager looks for finished downloads in .downloadIntermediates first
+    print_info("Pre-downloading system image with aria2c...")
+    intermediates = Path(android_home) / ".downloadIntermediates"
+    intermediates.mkdir(parents=True, exist_ok=True)
+    aria2c_cmd = ["aria2c", "-x", "8", "-s", "8", "--continue=true", "-d", intermediates]
+    checksum = archive.findtext("complete/checksum")
+    if checksum:
+        aria2c_cmd.append(f"--checksum=sha-1={checksum}")
+    aria2c_cmd.append(SYS_IMG_REPOSITORY + archive.findtext("complete/url"))
+
+    try:
+        downloaded = run_command(aria2c_cmd, timeout=DOWNLOAD_TIMEOUT, verbose=True) is not None
+    except subprocess.CalledProcessError:
+        downloaded = False
+    if not downloaded:
+        print_warning("aria2c download failed, sdkmanager will download the image")
+    return downloaded
+
+
+@lru_cache(maxsize=1)
+def _find_android_home():
+    """Return the Android SDK location from the environment or usual paths."""
+    android_home = os.environ.get("ANDROID_HOME") or os.environ.get("ANDROID_SDK_ROOT")
+    if android_home:
+        return android_home
+
+    # Android Studio installs SDK here on macOS
+    for path in [Path.home() / "Library/Android/sdk", Path.home() / "Android/Sdk", Path("/opt/android-sdk")]:
+        if path.exists():
+            return str(path)
+    return None
+
+
+def _is_running(pid):
+    """Return True if a process with this PID exists."""
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def _emulator_pid():
+    """Return the PID of the emulator started by this script if it is still running, or None."""
+    try:
+        pid = int(EMULATOR_PID_FILE.read_text())
+    except (OSError, ValueError):
+        return None
+    if not _is_running(pid):
+        return None
+
+    # The file outlives the emulator (it exited by itself, the host rebooted):
+    # make sure the PID was not reused by an unrelated process before trusting it
+    command = run_command(["ps", "-p", str(pid), "-o", "command="], check=False) or ""
+    if "emulator" not in command or f"-avd {AVD_NAME}" not in command:
+        EMULATOR_PID_FILE.unlink(missing_ok=True)
+        return None
+    return pid
+
+
+def find_running_emulator():
+    """Return ANDROID_HOME if the emulator left running by a previous run is booted."""
+    if _emulator_pid() is None:
+        return None
+
+    android_home = _find_android_home()
+    if not android_home:
+        return None
+
+    os.environ["ANDROID_HOME"] = android_home
+    os.environ["ANDROID_SDK_ROOT"] = android_home
+    os.environ["PATH"] = f"{android_home}/platform-tools:{android_home}/emulator:{os.environ['PATH']}"
+
+    serial = load_state().get("emulator_serial")
+    if serial:
+        os.environ["ANDROID_SERIAL"] = serial
+
+    if adb_query("adb get-state") != "device" or adb_query("adb shell getprop sys.boot_completed") != "1":
+        os.environ.pop("ANDROID_SERIAL", None)
+        ADB_SHELL.close()
+        return None
+    return android_home
+
+
 def check_android_studio_or_sdk():
     """Check for Android Studio or a valid Android SDK with emulator."""
     print_step("1.1", "Checking for Android Studio / Android SDK...")
 
-    # Android Studio installs SDK here on macOS
-    studio_sdk = Path.home() / "Library/Android/sdk"
-    android_home = os.environ.get("ANDROID_HOME") or os.environ.get("ANDROID_SDK_ROOT")
-    if not android_home:
-        android_home = str(studio_sdk) if studio_sdk.exists() else None
-    if not android_home:
-        for path in [Path.home() / "Android/Sdk", Path("/opt/android-sdk")]:
-            if path.exists():
-                android_home = str(path)
-                break
+    android_home = _find_android_home()
 
     if android_home and _sdk_has_emulator(android_home):
         print_success("Android SDK with Emulator found")
@@ -141,32 +643,64 @@ def check_homebrew():
     """Check if Homebrew is installed."""
     print_step("1.2", "Checking for Homebrew...")
 
-    if run_command("which brew", check=False):
+    if shutil.which("brew"):
         print_success("Homebrew is installed")
         return True
 
     print_warning("Homebrew is not installed")
     print_info("Installing Homebrew...")
 
-    install_cmd = '/bin/bash -c "$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh)"'
-    os.system(install_cmd)
+    # Run the installer directly on the terminal so its prompts stay interactive
+    installer = run_command(["curl", "-fsSL", HOMEBREW_INSTALLER], check=False, timeout=60)
+    if installer:
+        run_command(["/bin/bash", "-c", installer], check=False, capture=False, timeout=HOMEBREW_TIMEOUT)
+
+    return bool(shutil.which("brew"))
 
-    return run_command("which brew", check=False) is not None
+
+@lru_cache(maxsize=1)
+def _java_version():
+    """Return the first line of `java -version` (printed on stderr), or an empty string."""
+    java_home = os.environ.get("JAVA_HOME")
+    if not (java_home and Path(java_home, "bin/java").exists()) and Path(MACOS_JAVA_HOME).exists():
+        # The macOS /usr/bin/java stub never changes: resolve the JDK it would run
+        java_home = run_command([MACOS_JAVA_HOME], check=False)
+    if java_home and Path(java_home, "bin/java").exists():
+        java = str(Path(java_home, "bin/java"))
+    else:
+        java = shutil.which("java")
+    if not java:
+        return ""
+
+    # A found Java is remembered per JDK binary, so reruns skip starting a JVM
+    # (not for the stub itself, which would keep the answer forever)
+    java = os.path.realpath(java)
+    key = {"path": java, "mtime": os.stat(java).st_mtime}
+    cacheable = java != "/usr/bin/java"
+    cached = load_state().get("java", {})
+    if cacheable and cached.get("version") and {k: cached.get(k) for k in key} == key:
+        return cached["version"]
+
+    version = (run_command([java, "-version"], check=False, merge_stderr=True) or "").split("\n")[0]
+    if cacheable and "version" in version.lower():
+        save_state(java={**key, "version": version})
+    return version
 
 
 def check_java():
     """Check if Java is installed."""
     print_step("1.3", "Checking for Java...")
 
-    java_version = run_command("java -version 2>&1 | head -1", check=False)
+    java_version = _java_version()
     if java_version and "version" in java_version.lower():
         print_success(f"Java is installed: {java_version}")
         return True
 
     print_warning("Java is not installed")
     print_info("Installing Java via Homebrew...")
-    run_command("brew install openjdk@17", check=False)
-    run_command("sudo ln -sfn /opt/homebrew/opt/openjdk@17/libexec/openjdk.jdk /Library/Java/JavaVirtualMachines/openjdk-17.jdk", check=False)
+    run_command("brew install openjdk@17", check=False, timeout=INSTALL_TIMEOUT)
+    # Leave time to type the sudo password
+    run_command("sudo ln -sfn /opt/homebrew/opt/openjdk@17/libexec/openjdk.jdk /Library/Java/JavaVirtualMachines/openjdk-17.jdk", check=False, timeout=120)
 
     return True
 
@@ -176,26 +710,14 @@ def setup_android_sdk():
     print_step("1.4", "Configuring Android SDK...")
 
     # Check if Android SDK exists
-    android_home = os.environ.get("ANDROID_HOME") or os.environ.get("ANDROID_SDK_ROOT")
-
-    if not android_home:
-        # Try common locations
-        possible_paths = [
-            Path.home() / "Library/Android/sdk",
-            Path.home() / "Android/Sdk",
-            Path("/opt/android-sdk"),
-        ]
-        for path in possible_paths:
-            if path.exists():
-                android_home = str(path)
-                break
+    android_home = _find_android_home()
 
     if not android_home or not Path(android_home).exists():
         print_warning("Android SDK not found")
         print_info("Installing Android SDK...")
 
         # Install via Homebrew
-        run_command("brew install --cask android-commandlinetools", check=False)
+        run_command("brew install --cask android-commandlinetools", check=False, timeout=INSTALL_TIMEOUT)
         android_home = str(Path.home() / "Library/Android/sdk")
         Path(android_home).mkdir(parents=True, exist_ok=True)
 
@@ -227,7 +749,7 @@ def setup_android_sdk():
 
     if not sdkmanager:
         print_info("Installing command-line tools...")
-        run_command("brew install --cask android-commandlinetools", check=False)
+        run_command("brew install --cask android-commandlinetools", check=False, timeout=INSTALL_TIMEOUT)
         sdkmanager = "/opt/homebrew/share/android-commandlinetools/cmdline-tools/latest/bin/sdkmanager"
 
     if not Path(sdkmanager).exists():
@@ -235,6 +757,11 @@ def setup_android_sdk():
         print_error("Please install Android Studio from https://developer.android.com/studio (includes SDK and Emulator)")
         sys.exit(1)
 
+    # Restore the system image from a previous run before hitting the network,
+    # otherwise fetch the large system image with parallel connections
+    restore_cache(android_home)
+    preseed_system_image(android_home)
+
     # Install required components
     print_step("1.5", "Installing required SDK components...")
 
@@ -245,11 +772,33 @@ def setup_android_sdk():
         SYSTEM_IMAGE,
     ]
 
-    # Force install into ANDROID_HOME (Homebrew sdkmanager otherwise uses its own prefix)
-    sdk_root_arg = f'--sdk_root="{android_home}"'
-    for component in components:
-        print_info(f"Installing {component}...")
-        run_command(f'yes | "{sdkmanager}" {sdk_root_arg} "{component}"', check=False)
+    # Skip sdkmanager (a JVM start plus a repository check) when a previous
+    # run already installed the same components into this SDK
+    sdk_state = {"root": android_home, "components": components}
+    installed = (
+        load_state().get("sdk") == sdk_state
+        and Path(f"{android_home}/platform-tools/adb").exists()
+        and _sdk_has_emulator(android_home)
+        and _sdk_has_system_image(android_home)
+    )
+
+    if installed:
+        print_success("SDK components already installed")
+    else:
+        # Force install into ANDROID_HOME (Homebrew sdkmanager otherwise uses its own prefix)
+        # One sdkmanager run for all components: a single JVM start and package download session
+        print_info(f"Installing {', '.join(components)}...")
+        # sdkmanager warns and re-checks for this file on every run if it is missing
+        repositories_cfg = AVD_HOME.parent / "repositories.cfg"
+        repositories_cfg.parent.mkdir(parents=True, exist_ok=True)
+        repositories_cfg.touch()
+        run_command(
+            [sdkmanager, f"--sdk_root={android_home}", *components],
+            check=False,
+            timeout=DOWNLOAD_TIMEOUT,
+            input="y\n" * 20,  # accept the license prompts
+            verbose=True,  # show download progress
+        )
 
     if not _sdk_has_emulator(android_home):
         print_error("Emulator binary not found after installing components.")
@@ -261,6 +810,9 @@ def setup_android_sdk():
         print_error("Please install Android Studio from https://developer.android.com/studio and install the SDK + Emulator system image.")
         sys.exit(1)
 
+    save_cache(android_home)
+
+    save_state(sdk=sdk_state)
     return android_home, sdkmanager
 
 
@@ -269,30 +821,71 @@ def create_avd(android_home, sdkmanager):
     print_step("2.1", f"Creating emulator '{AVD_NAME}'...")
 
     avdmanager = sdkmanager.replace("sdkmanager", "avdmanager")
-    sdk_root_arg = f'--sdk_root="{android_home}"'
 
-    # Check if AVD already exists
-    avd_list = run_command(f'"{avdmanager}" {sdk_root_arg} list avd', check=False) or ""
+    # Check if AVD already exists, on disk first to avoid starting avdmanager
+    avd_exists = (AVD_HOME / f"{AVD_NAME}.avd" / "config.ini").exists() and (AVD_HOME / f"{AVD_NAME}.ini").exists()
+    if not avd_exists:
+        avd_list = run_command([avdmanager, f"--sdk_root={android_home}", "list", "avd"], check=False, timeout=120) or ""
+        avd_exists = AVD_NAME in avd_list
 
-    if AVD_NAME in avd_list:
+    if avd_exists:
         print_success(f"Emulator '{AVD_NAME}' already exists")
+        tune_avd_config()
         return True
 
     # Create AVD (use --sdk_root so AVD points at our SDK's system image)
     print_info("Creating a new emulator...")
 
-    create_cmd = f'echo "no" | "{avdmanager}" {sdk_root_arg} create avd -n {AVD_NAME} -k "{SYSTEM_IMAGE}" --device "pixel_6"'
-    result = run_command(create_cmd, check=False)
+    # Answer "no" to the custom hardware profile prompt
+    result = run_command(
+        [avdmanager, f"--sdk_root={android_home}", "create", "avd",
+         "-n", AVD_NAME, "-k", SYSTEM_IMAGE, "--device", "pixel_6"],
+        check=False,
+        timeout=120,
+        input="no\n",
+    )
 
     if result is None:
         # Try alternative approach
-        create_cmd = f'"{avdmanager}" {sdk_root_arg} create avd -n {AVD_NAME} -k "{SYSTEM_IMAGE}" --device "pixel_6" --force'
-        run_command(create_cmd, check=False)
+        run_command(
+            [avdmanager, f"--sdk_root={android_home}", "create", "avd",
+             "-n", AVD_NAME, "-k", SYSTEM_IMAGE, "--device", "pixel_6", "--force"],
+            check=False,
+            timeout=120,
+        )
 
+    tune_avd_config()
     print_success("Emulator created")
     return True
 
 
+def tune_avd_config():
+    """Apply AVD_CONFIG to the AVD's config.ini. Return True if it changed."""
+    config = AVD_HOME / f"{AVD_NAME}.avd" / "config.ini"
+    if not config.exists():
+        return False
+
+    lines = config.read_text().splitlines()
+    pending = dict(AVD_CONFIG)
+    changed = False
+    for i, line in enumerate(lines):
+        key = line.split("=", 1)[0].strip()
+        if key in pending:
+            value = pending.pop(key)
+            if line.split("=", 1)[-1].strip() != value:
+                lines[i] = f"{key}={value}"
+                changed = True
+    lines += [f"{key}={value}" for key, value in pending.items()]
+
+    if changed or pending:
+        config.write_text("\n".join(lines) + "\n")
+        # A snapshot taken with the old hardware settings can no longer be loaded
+        shutil.rmtree(AVD_HOME / f"{AVD_NAME}.avd" / "snapshots" / SNAPSHOT_NAME, ignore_errors=True)
+        print_info("Emulator hardware settings updated")
+        return True
+    return False
+
+
 def start_emulator(android_home):
     """Start the Android emulator."""
     print_step("2.2", "Starting the emulator...")
@@ -304,75 +897,129 @@ def start_emulator(android_home):
 
     emulator_path = f"{android_home}/emulator/emulator"
     if not Path(emulator_path).exists():
-        # Resolve via PATH (set earlier in setup_android_sdk) so Popen gets a full path
-        emulator_path = shutil.which("emulator") or emulator_path
-    if not emulator_path or (emulator_path == f"{android_home}/emulator/emulator" and not Path(emulator_path).exists()):
+        # Resolve via PATH (set earlier in setup_android_sdk) so the spawn gets a full path
+        emulator_path = shutil.which("emulator")
+    if not emulator_path:
         print_error("Emulator binary not found. Check ANDROID_HOME and that SDK components are installed.")
         return False
 
-    # Check if emulator is already running
-    devices = run_command("adb devices", check=False) or ""
-    if "emulator" in devices and "device" in devices:
-        print_success("Emulator is already running")
-        return True
+    # Check if our emulator is already running; other emulators and phones are left alone
+    devices = adb_query("adb devices") or ""
+    emulators = EMULATOR_SERIAL.findall(devices)
+    for port, state in emulators:
+        if state != "device":
+            continue
+        serial = f"emulator-{port}"
+        # The console answers with the AVD name, then "OK"
+        avd_name = run_command(["adb", "-s", serial, "emu", "avd", "name"], check=False) or ""
+        if avd_name.split()[:1] == [AVD_NAME]:
+            os.environ["ANDROID_SERIAL"] = serial
+            ADB_SHELL.close()
+            _adb_cached.cache_clear()
+            save_state(emulator_serial=serial)
+            print_success(f"Emulator is already running ({serial})")
+            return True
+
+    # Pin the console port so the serial is known up front; with ANDROID_SERIAL
+    # set, every adb call (and the persistent shell) targets this emulator
+    # directly, even when other devices are attached
+    used_ports = {int(port) for port, _ in emulators}
+    port = next((port for port in EMULATOR_PORTS if port not in used_ports), None)
+    if port is None:
+        print_error(f"No free emulator console port: {len(used_ports)} emulators are already running")
+        print_info("Stop one of them (adb -s <serial> emu kill) and run the script again.")
+        return False
+    os.environ["ANDROID_SERIAL"] = f"emulator-{port}"
+    ADB_SHELL.close()
+    _adb_cached.cache_clear()
 
     # Start emulator in background (log stderr so we can debug if it fails)
     print_info("Launching the emulator (this may take a few minutes)...")
     emulator_log = SCRIPT_DIR / "emulator.log"
 
-    with open(emulator_log, "w") as logf:
-        proc = subprocess.Popen(
-            [emulator_path, "-avd", AVD_NAME, "-no-snapshot", "-writable-system", "-no-audio"],
-            stdout=logf,
-            stderr=subprocess.STDOUT,
-            cwd=SCRIPT_DIR,
-            env={**os.environ, "ANDROID_HOME": android_home, "ANDROID_SDK_ROOT": android_home},
-        )
-
-    # Wait for emulator to appear (adb wait-for-device)
+    # Boot from the saved snapshot when available, cold boot otherwise
+    if not _has_snapshot():
+        snapshot_args = ["-no-snapshot"]
+    else:
+        print_info(f"Booting from snapshot '{SNAPSHOT_NAME}'")
+        snapshot_args = ["-snapshot", SNAPSHOT_NAME, "-no-snapshot-save"]
+
+    # posix_spawn starts the emulator without forking this (by now large) Python
+    # process. It inherits os.environ, which has ANDROID_HOME/ANDROID_SDK_ROOT
+    # set, and only stdin/stdout/stderr: every other descriptor here is
+    # close-on-exec. stdin is /dev/null, wait_for_login reads the terminal.
+    emulator_pid = os.posix_spawn(
+        emulator_path,
+        [emulator_path, "-avd", AVD_NAME, "-port", str(port), *snapshot_args, *EMULATOR_FLAGS],
+        os.environ,
+        file_actions=[
+            (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+            (os.POSIX_SPAWN_OPEN, 1, str(emulator_log), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644),
+            (os.POSIX_SPAWN_DUP2, 1, 2),
+        ],
+    )
+
+    # Lets the next run find and reuse this emulator
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    EMULATOR_PID_FILE.write_text(str(emulator_pid))
+    save_state(emulator_serial=os.environ["ANDROID_SERIAL"])
+
+    # Wait for emulator to appear and finish booting, in a single adb call
     print_info("Waiting for emulator to start...")
-    run_command("adb wait-for-device", timeout=90, check=False)
-
     max_wait = 420  # 7 minutes (first boot of arm64 image can be slow)
-    start_time = time.time()
 
-    while time.time() - start_time < max_wait:
-        if proc.poll() is not None:
-            print()
-            print_error("Emulator process exited unexpectedly. Check emulator.log for details.")
-            return False
-        devices = run_command("adb devices", check=False) or ""
-        if "emulator" in devices and "device" in devices:
-            if "offline" in devices:
-                time.sleep(5)
-                print(".", end="", flush=True)
-                continue
-            # Check if boot completed
-            boot_completed = run_command("adb shell getprop sys.boot_completed", check=False)
-            if boot_completed and boot_completed.strip() == "1":
-                print_success("Emulator started and ready!")
-                time.sleep(5)  # Give it a few more seconds
-                return True
-
-        time.sleep(5)
-        print(".", end="", flush=True)
-
-    print()
-    print_error("Timeout: emulator did not start in time")
-    print_info(f"Check {emulator_log} for emulator output.")
-    return False
+    boot_wait = subprocess.Popen(
+        ["adb", "wait-for-device", "shell",
+         'while [ "$(getprop sys.boot_completed)" != "1" ]; do sleep 1; done'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    # Stop waiting as soon as the emulator process exits
+    emulator_exited = threading.Event()
+
+    def watch_emulator():
+        os.waitpid(emulator_pid, 0)
+        emulator_exited.set()
+        boot_wait.kill()
+
+    threading.Thread(target=watch_emulator, daemon=True).start()
+
+    try:
+        boot_wait.wait(timeout=max_wait)
+    except subprocess.TimeoutExpired:
+        boot_wait.kill()
+        print_error("Timeout: emulator did not start in time")
+        print_info(f"Check {emulator_log} for emulator output.")
+        return False
+
+    if emulator_exited.is_set() or boot_wait.returncode != 0:
+        print_error("Emulator process exited unexpectedly. Check emulator.log for details.")
+        return False
+
+    print_success("Emulator started and ready!")
+    # boot_completed is set slightly before the package manager accepts calls
+    _wait_until(lambda: ADB_SHELL.send("pm path android")[0], 30)
+    return True
+
+
+def save_snapshot():
+    """Save the running emulator as SNAPSHOT_NAME unless a snapshot already exists."""
+    # Taken once the app is installed but before it is launched: booting from
+    # the snapshot also restores userdata, so later runs skip the install but
+    # still start logged out and extract a fresh session
+    if _has_snapshot():
+        return False
+    print_info(f"Saving snapshot '{SNAPSHOT_NAME}' for faster next boots...")
+    run_command(f"adb emu avd snapshot save {SNAPSHOT_NAME}", check=False, timeout=120)
+    return True
 
 
 def setup_root():
     """Setup root access on emulator."""
     print_step("2.3", "Setting up root access...")
 
-    run_command("adb root", check=False)
-    time.sleep(3)
-
-    # Verify root
-    whoami = run_command("adb shell whoami", check=False)
-    if whoami and "root" in whoami:
+    if enable_root():
         print_success("Root access enabled")
         return True
 
@@ -380,6 +1027,53 @@ def setup_root():
     return True
 
 
+def _apk_version(apk_path, apk_hash):
+    """Return the versionCode of a local APK via aapt/aapt2, or None if unavailable."""
+    # aapt is slow on a large APK, so the answer is kept next to the APK hash
+    cached = load_state().get("apk", {})
+    if cached.get("sha256") == apk_hash and cached.get("version_code"):
+        return cached["version_code"]
+
+    aapt = shutil.which("aapt2") or shutil.which("aapt")
+    if not aapt:
+        android_home = os.environ.get("ANDROID_HOME", "")
+        candidates = sorted(Path(android_home).glob("build-tools/*/aapt*")) if android_home else []
+        aapt = str(candidates[-1]) if candidates else None
+    if not aapt:
+        return None
+
+    output = run_command([aapt, "dump", "badging", apk_path], check=False)
+    match = APK_VERSION.search(output or "")
+    if not match:
+        return None
+    if cached.get("sha256") == apk_hash:
+        save_state(apk={**cached, "version_code": match.group(1)})
+    return match.group(1)
+
+
+def _apk_sha256(apk_path):
+    """Return the SHA-256 of the APK, reusing the recorded one if size and mtime match."""
+    stat = apk_path.stat()
+    key = {"path": str(apk_path), "size": stat.st_size, "mtime": stat.st_mtime}
+    cached = load_state().get("apk", {})
+    if cached.get("sha256") and {k: cached.get(k) for k in key} == key:
+        return cached["sha256"]
+
+    digest = hashlib.sha256()
+    with open(apk_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    save_state(apk={**key, "sha256": digest.hexdigest()})
+    return digest.hexdigest()
+
+
+def _installed_version():
+    """Return the versionCode of the installed DJI Home app, or None."""
+    output = adb_query("adb shell dumpsys package com.dji.home | grep versionCode=")
+    match = INSTALLED_VERSION.search(output or "")
+    return match.group(1) if match else None
+
+
 def install_apk():
     """Install DJI Home APK."""
     print_step("3.1", "Installing DJI Home APK...")
@@ -407,16 +1101,42 @@ def install_apk():
 
     print_info(f"Installing {apk_path.name}...")
 
-    # Check if already installed
-    packages = run_command("adb shell pm list packages | grep dji.home", check=False)
-    if packages and "com.dji.home" in packages:
-        print_success("DJI Home is already installed")
-        return True
+    # Check if already installed, and reinstall only when the APK is a different version
+    # pm path looks up the one package instead of listing all of them
+    package_path = adb_query("adb shell pm path com.dji.home")
+    apk_hash = _apk_sha256(apk_path)
+    if package_path and package_path.startswith("package:"):
+        # The hash written after the last install identifies the exact APK
+        if adb_query(f"adb shell cat {APK_HASH_MARKER}") == apk_hash:
+            print_success("DJI Home is already installed (same APK)")
+            return True
+
+        # A different hash means a different APK unless the version codes say otherwise;
+        # without aapt the version is unknown, so reinstall to be safe
+        installed_ver = _installed_version()
+        local_ver = _apk_version(apk_path, apk_hash)
+        if local_ver and local_ver == installed_ver:
+            ADB_SHELL.send(f"echo {apk_hash} > {APK_HASH_MARKER}")
+            print_success(f"DJI Home is already installed (version code {installed_ver})")
+            return True
+        if local_ver:
+            print_info(f"Installed version code {installed_ver} differs from APK version code {local_ver}, reinstalling...")
+        else:
+            print_info("Could not read the APK version and it is not the last installed APK, reinstalling...")
 
     # Install APK
-    result = run_command(f'adb install -r "{apk_path}"', check=False)
+    # --streaming feeds the APK straight into the package manager session
+    # instead of pushing it to /data/local/tmp first and copying it from there
+    result = run_command(["adb", "install", "--streaming", "-r", apk_path], check=False,
+                         timeout=INSTALL_TIMEOUT, merge_stderr=True)
+    if result and "Success" not in result and "streaming" in result.lower():
+        # Old platform-tools or image without streamed installs
+        result = run_command(["adb", "install", "-r", apk_path], check=False,
+                             timeout=INSTALL_TIMEOUT, merge_stderr=True)
+    _adb_cached.cache_clear()
 
     if result and "Success" in result:
+        ADB_SHELL.send(f"echo {apk_hash} > {APK_HASH_MARKER}")
         print_success("APK installed successfully")
         return True
 
@@ -428,8 +1148,17 @@ def launch_app():
     """Launch DJI Home app."""
     print_step("3.2", "Launching DJI Home app...")
 
-    run_command("adb shell am start -n com.dji.home/.MainActivity", check=False)
-    time.sleep(5)
+    # -W returns once the activity has been drawn, reporting its status and launch time
+    output = ADB_SHELL.send("am start -W -n com.dji.home/.MainActivity", timeout=60)[0] or ""
+    launch_time = LAUNCH_TIME.search(output)
+    if "Status: ok" in output:
+        print_success(f"App launched ({launch_time.group(1)}ms)" if launch_time else "App launched")
+        return True
+
+    # No usable report (older am or a timeout): wait for the process, then for its activity to be on screen
+    if not _wait_until(_app_pid, 30) or not _wait_until(_app_in_foreground, 30):
+        print_warning("DJI Home does not seem to be in the foreground yet")
+        return True
 
     print_success("App launched")
     return True
@@ -445,114 +1174,301 @@ def wait_for_login():
 Please log in to your DJI account in the app.
 
 Once logged in and on the main screen (with your robot visible),
-press ENTER to continue...{Colors.END}
+press ENTER to continue. The script also continues by itself as soon
+as it sees that you are logged in...{Colors.END}
 """)
 
-    input(f"{Colors.CYAN}>>> Press ENTER when you are logged in... {Colors.END}")
+    print(f"{Colors.CYAN}>>> Press ENTER when you are logged in... {Colors.END}", end="", flush=True)
+
+    # Wait for ENTER or for the login to show up in the app's preferences
+    # (already there on reruns with a logged-in emulator)
+    watch_stdin = True
+    deadline = time.monotonic() + LOGIN_TIMEOUT
+    failures = 0
+    while True:
+        rc = ADB_SHELL.send(f"grep -q flutter.user_id {APP_PREFS}")[1]
+        if rc == 0:
+            print()
+            print_success("Login detected")
+            time.sleep(LOGIN_SETTLE)
+            break
+        failures = failures + 1 if rc is None else 0
+        if failures >= LOGIN_MAX_FAILURES:
+            print()
+            print_error("Lost the connection to the emulator while waiting for the login")
+            return False
+        if time.monotonic() >= deadline:
+            print()
+            print_error(f"No login after {LOGIN_TIMEOUT // 60} minutes")
+            return False
+        if not watch_stdin:
+            time.sleep(LOGIN_POLL_INTERVAL)
+        elif select.select([sys.stdin], [], [], LOGIN_POLL_INTERVAL)[0]:
+            if sys.stdin.readline():
+                break
+            watch_stdin = False  # stdin closed: rely on login detection only
 
-    # Verify app is running and logged in
-    time.sleep(2)
+    # Verify app is still running
+    if not _wait_until(_app_pid, 5):
+        print_warning("DJI Home is not running anymore")
     return True
 
 
+@lru_cache(maxsize=1)
+def _hyperscan_database():
+    """Compile the Hyperscan database once per run."""
+    # Keyed patterns are too large for Hyperscan with start-of-match tracking,
+    # so only their context is located and re extracts the value after it.
+    expressions = [
+        context.replace(VALUE_GAP, b"") if context else EXPRESSIONS[field]
+        for field, (context, value) in FIELDS.items()
+    ]
+    count = len(expressions)
+    db = hyperscan.Database()
+    db.compile(
+        expressions=expressions,
+        ids=list(range(count)),
+        elements=count,
+        flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * count,
+    )
+    return db
+
+
+def _hyperscan_scan(buf, record):
+    """Locate credential matches with Hyperscan and pass them to record()."""
+    seen = set()
+
+    def on_match(expr_id, start, end, flags, context):
+        if start in seen:
+            return False
+        seen.add(start)
+        return record(PATTERN.match(buf, start))
+
+    try:
+        _hyperscan_database().scan(buf, match_event_handler=on_match)
+    except hyperscan.ScanTerminated:
+        pass
+
+
+def _prefilter_scan(buf, record):
+    """Locate credential matches by literal prefix and pass them to record()."""
+    # find() is a C-level substring search, far cheaper than running the
+    # whole alternation at every offset of the dump
+    hits = []
+    for anchor in ANCHORS:
+        pos = buf.find(anchor)
+        while pos != -1:
+            match = PATTERN.match(buf, pos)
+            if match:
+                hits.append((pos, match))
+                break
+            pos = buf.find(anchor, pos + 1)
+
+    # Keep the first match in dump order when several anchors share a field
+    for _, match in sorted(hits, key=lambda hit: hit[0]):
+        record(match)
+
+
+def _scan_window(buf, limit):
+    """Scan one window of the dump; return its first match per field and its serial candidates."""
+    credentials = {}
+    sn_candidates = Counter()
+
+    def record(match):
+        """Record a match; return True once every field has been found."""
+        # Matches starting in the overlap are left to the next window
+        if match is None or match.start() >= limit:
+            return False
+        key = match.lastgroup
+        if key == "sn_candidate":
+            sn_candidates[bytes(match.group(key))] += 1
+        elif key not in credentials:
+            credentials[key] = match.group(key).decode("ascii")
+        return len(credentials) == len(SCAN_FIELDS)
+
+    if hyperscan is not None:
+        _hyperscan_scan(buf, record)
+    else:
+        _prefilter_scan(buf, record)
+        if "device_sn" not in credentials:
+            for match in SN_CANDIDATE.finditer(buf):
+                if match.start() < limit:
+                    sn_candidates[bytes(match.group())] += 1
+
+    return credentials, sn_candidates
+
+
+def _scan_memory(chunks):
+    """Scan memory dump chunks as they arrive; return the first match of each field and the bytes read."""
+    credentials = {}
+    sn_candidates = Counter()
+    pending = deque()
+
+    def merge(future):
+        # Windows are merged in dump order, so the first match still wins
+        found, candidates = future.result()
+        for key, value in found.items():
+            credentials.setdefault(key, value)
+        sn_candidates.update(candidates)
+        return len(credentials) == len(SCAN_FIELDS)
+
+    carry = b""
+    size = 0
+    done = False
+    with ProcessPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+        for chunk in chunks:
+            size += len(chunk)
+            buf = carry + chunk
+            limit = max(len(buf) - DUMP_OVERLAP, 0)
+            pending.append(pool.submit(_scan_window, buf, limit))
+            carry = buf[limit:]
+
+            # Keep at most one window per worker in flight
+            while pending and not done and (pending[0].done() or len(pending) > SCAN_WORKERS):
+                done = merge(pending.popleft())
+            if done:
+                break  # everything found, the rest of the dump is not needed
+        else:
+            pending.append(pool.submit(_scan_window, carry, len(carry)))
+
+        while pending and not done:
+            done = merge(pending.popleft())
+        for future in pending:
+            future.cancel()
+
+    # Fall back to the most frequent serial-like string
+    if not credentials.get("device_sn") and sn_candidates:
+        credentials["device_sn"] = sn_candidates.most_common(1)[0][0].decode("ascii")
+
+    return credentials, size
+
+
+def _parse_sections(output):
+    """Split shell output delimited by '=== KEY ===' lines into a dict."""
+    return {key.lower(): value.strip() for key, value in SECTION.findall(output)}
+
+
+def _heap_regions(maps):
+    """Return the (start, end) address ranges of heap regions in a maps listing."""
+    regions = []
+    for line in maps.splitlines():
+        match = HEAP_REGION.match(line.strip())
+        if match:
+            regions.append((int(match.group(1), 16), int(match.group(2), 16)))
+    return regions
+
+
+def _dump_commands(pid, regions):
+    """Build the shell commands that write the given regions to stdout, in order."""
+    if not regions:
+        # Unknown layout: fall back to 500MB starting at 0x12c00000 (skip=300)
+        return [f"dd if=/proc/{pid}/mem bs=1048576 skip={0x12c00000 // 1048576} count=500 2>/dev/null"]
+
+    # Mappings that touch are read as one range
+    merged = []
+    for start, end in regions:
+        if merged and merged[-1][1] == start:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    # One dd per range, in the largest block size its alignment allows, and no
+    # more than DUMP_COMMAND_MAX bytes of them per adb exec-out call
+    commands, current = [], []
+    for start, end in merged:
+        alignment = math.gcd(start, end - start)
+        block = min(alignment & -alignment, DUMP_BLOCK_MAX)
+        dd = f"dd if=/proc/{pid}/mem bs={block} skip={start // block} count={(end - start) // block} 2>/dev/null"
+        if current and len("; ".join(current + [dd])) > DUMP_COMMAND_MAX:
+            commands.append("; ".join(current))
+            current = []
+        current.append(dd)
+    commands.append("; ".join(current))
+    return commands
+
+
+def _stream_dump(commands):
+    """Run dump commands over adb exec-out one after the other and yield their output in chunks."""
+    deadline = time.monotonic() + DUMP_TIMEOUT
+    for command in commands:
+        proc = subprocess.Popen(["adb", "exec-out", command], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            proc.kill()
+
+        # DUMP_TIMEOUT covers the whole dump, not each call
+        timer = threading.Timer(max(deadline - time.monotonic(), 0), kill)
+        timer.start()
+        try:
+            while True:
+                chunk = proc.stdout.read(DUMP_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+            if timed_out.is_set():
+                print_warning(f"Memory dump timed out after {DUMP_TIMEOUT}s, using what was read")
+                return
+        finally:
+            # Also reached when the scan stops early: end the transfer
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
+
+
 def extract_credentials():
     """Extract credentials from app memory."""
     print_header("EXTRACTING CREDENTIALS")
 
     # Re-enable root access (may have been lost)
     print_step("4.0", "Enabling root access...")
-    run_command("adb root", check=False)
-    time.sleep(3)
+    enable_root()
 
-    # Verify root
-    whoami = run_command("adb shell whoami", check=False)
-    if whoami and "root" in whoami:
+    # Verify root, find the process and read its memory maps in one call
+    probe = _parse_sections(ADB_SHELL.send(PROBE_SCRIPT)[0] or "")
+
+    if "root" in probe.get("whoami", ""):
         print_success("Root access OK")
     else:
         print_warning("Limited root access - trying anyway...")
 
     print_step("4.1", "Searching for DJI Home process...")
 
-    # Get PID
-    pid = run_command("adb shell pidof com.dji.home", check=False)
+    pid = probe.get("pid")
 
     if not pid:
         print_error("App not found. Is it running?")
         return None
 
-    pid = pid.strip().split()[0]  # Get first PID if multiple
+    pid = pid.split()[0]  # Get first PID if multiple
     print_success(f"Process found: PID {pid}")
 
-    print_step("4.2", "Extracting memory (this may take a moment)...")
-
-    # Calculate skip value (0x12c00000 / 1048576 = 300)
-    skip_value = 0x12c00000 // 1048576  # = 300
-
-    # Dump memory - use simpler command
-    dump_cmd = f"dd if=/proc/{pid}/mem bs=1048576 skip={skip_value} count=500 of=/data/local/tmp/heap.bin"
+    print_step("4.2", "Extracting and analyzing memory (this may take a moment)...")
 
-    print_info(f"Command: {dump_cmd}")
-
-    result = run_command(f'adb shell "{dump_cmd}" 2>&1', check=False, timeout=180)
+    # Only dump the heap regions instead of a fixed 500MB range
+    maps = probe.get("maps", "")
+    regions = _heap_regions(maps)
+    if regions:
+        size_mb = sum(end - start for start, end in regions) / 1048576
+        print_info(f"Dumping {len(regions)} heap regions ({size_mb:.0f}MB)")
+    else:
+        print_warning("No heap regions found in memory maps, dumping fixed range")
 
-    # Check if file was created
-    file_check = run_command("adb shell ls -la /data/local/tmp/heap.bin", check=False)
+    # Stream the memory to the host and scan it while it arrives,
+    # nothing is written on the device or to disk
+    with closing(_stream_dump(_dump_commands(pid, regions))) as dump:
+        credentials, size = _scan_memory(dump)
 
-    if not file_check or "No such file" in str(file_check):
+    if not size:
         print_error("Memory dump failed")
-        print_info(f"Result: {result}")
-
-        # Try alternative method with cat
-        print_info("Trying alternative method...")
-        alt_cmd = f"cat /proc/{pid}/maps | head -5"
-        maps = run_command(f'adb shell "{alt_cmd}"', check=False)
-        print_info(f"Memory maps: {maps}")
-
+        maps_head = "\n".join(maps.splitlines()[:5])
+        print_info(f"Memory maps: {maps_head}")
         return None
 
-    print_success(f"Memory extracted: {file_check}")
-
-    print_step("4.3", "Analyzing data...")
-
-    # Extract strings and search for credentials
-    extract_cmd = """
-    cd /data/local/tmp &&
-    echo "=== USER_TOKEN ===" &&
-    strings heap.bin | grep -o 'US_[A-Za-z0-9_-]\\{50,\\}' | head -1 &&
-    echo "=== USER_ID ===" &&
-    strings heap.bin | grep -A 1 'flutter.user_id' | grep -o '[0-9]\\{15,\\}' | head -1 &&
-    echo "=== USER_EMAIL ===" &&
-    strings heap.bin | grep -A 1 'flutter.user_email' | grep -oE '[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\\.[a-zA-Z]{2,}' | head -1 &&
-    echo "=== USER_NAME ===" &&
-    strings heap.bin | grep -o 'djiuser_[A-Za-z0-9_]*' | head -1 &&
-    echo "=== DEVICE_SN ===" &&
-    (strings heap.bin | grep -oE '"sn":"[A-Z0-9]+"|"device_sn":"[A-Z0-9]+"' | head -1 | grep -oE '[A-Z0-9]{10,}' || strings heap.bin | grep -oE '[0-9][A-Z]{3,4}[A-Z0-9]{8,}' | sort | uniq -c | sort -rn | head -1 | sed 's/^[[:space:]]*[0-9]*[[:space:]]*//' ) &&
-    echo "=== PAIR_UUID ===" &&
-    strings heap.bin | grep -oE 'ROMO-[A-Z0-9]+' | head -1 &&
-    echo "=== IOT_URL ===" &&
-    strings heap.bin | grep -o 'things-access[a-z0-9.-]*\\.iot\\.djigate\\.com' | head -1 &&
-    echo "=== DEVICE_UUID ===" &&
-    strings heap.bin | grep -A 1 'flutter._deviceUUIDKey' | grep -oE '[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}' | head -1 &&
-    rm -f heap.bin
-    """
-
-    output = run_command(f'adb shell "{extract_cmd}"', check=False, timeout=60)
-
-    if not output:
-        print_error("Extraction failed")
-        return None
-
-    # Parse output
-    credentials = {}
-    current_key = None
-
-    for line in output.split('\n'):
-        line = line.strip()
-        if line.startswith("=== ") and line.endswith(" ==="):
-            current_key = line[4:-4].lower()
-        elif line and current_key:
-            credentials[current_key] = line
-            current_key = None
+    print_success(f"Memory scanned: {size / 1048576:.0f}MB")
 
     # Validate
     if not credentials.get("user_token"):
@@ -565,34 +1481,62 @@ def extract_credentials():
     return credentials
 
 
+def _api_session():
+    """Return the shared requests session, with connection pooling and retries."""
+    global _SESSION
+    if _SESSION is None:
+        # Imported here, once credentials exist: failed runs never load or install it
+        if importlib.util.find_spec("requests") is None:
+            run_command([sys.executable, "-m", "pip", "install", "requests"], check=False, timeout=INSTALL_TIMEOUT)
+            importlib.invalidate_caches()
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        _SESSION = requests.Session()
+        _SESSION.mount("https://", HTTPAdapter(pool_maxsize=8, max_retries=retry))
+    return _SESSION
+
+
 def test_api(credentials):
     """Test the extracted credentials with DJI API."""
     print_step("4.4", "Testing credentials with DJI API...")
 
-    try:
-        import requests
-    except ImportError:
-        run_command("pip3 install requests", check=False)
-        import requests
-
     user_token = credentials.get("user_token")
     if not user_token:
         print_warning("Cannot test without user_token")
         return credentials
 
+    session = _api_session()
+
     headers = {
         "x-member-token": user_token,
         "X-DJI-locale": "en_US",
     }
 
-    # Get MQTT credentials
-    try:
-        response = requests.get(
-            "https://home-api-vg.djigate.com/app/api/v1/users/auth/token",
-            params={"reason": "mqtt"},
+    # The token and device list requests are independent: send them together
+    pool = ThreadPoolExecutor(max_workers=2)
+    token_request = pool.submit(
+        session.get,
+        "https://home-api-vg.djigate.com/app/api/v1/users/auth/token",
+        params={"reason": "mqtt"},
+        headers=headers,
+        timeout=API_TIMEOUT
+    )
+    homes_request = None
+    if not credentials.get("device_sn"):
+        homes_request = pool.submit(
+            session.get,
+            "https://home-api-vg.djigate.com/app/api/v1/homes",
             headers=headers,
-            timeout=30
+            timeout=API_TIMEOUT
         )
+    pool.shutdown(wait=False)
+
+    # Get MQTT credentials
+    try:
+        response = token_request.result()
 
         data = response.json()
 
@@ -612,15 +1556,11 @@ def test_api(credentials):
         print_warning(f"API error: {e}")
 
     # Try to get device list if SN not found
-    if not credentials.get("device_sn"):
+    if homes_request is not None:
         print_step("4.5", "Retrieving devices via API...")
         try:
             # Try homes endpoint
-            response = requests.get(
-                "https://home-api-vg.djigate.com/app/api/v1/homes",
-                headers=headers,
-                timeout=30
-            )
+            response = homes_request.result()
             data = response.json()
 
             if data.get("result", {}).get("code") == 0:
@@ -642,52 +1582,42 @@ def test_api(credentials):
     return credentials
 
 
-def save_credentials(credentials):
-    """Save credentials to file."""
-    print_step("5", "Saving credentials...")
-
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # Create .env file for mqtt client
-    env_content = f"""# DJI Home Credentials - Extracted on {timestamp}
+# .env file for the MQTT client, and the human-readable credentials summary
+ENV_TEMPLATE = Template("""# DJI Home Credentials - Extracted on $timestamp
 # This file is used by dji_mqtt_client.py
 
-DJI_USER_TOKEN={credentials.get('user_token', '')}
-DJI_USER_ID={credentials.get('user_id', '')}
-DJI_DEVICE_SN={credentials.get('device_sn', '')}
+DJI_USER_TOKEN=$user_token
+DJI_USER_ID=$user_id
+DJI_DEVICE_SN=$device_sn
 DJI_API_URL=https://home-api-vg.djigate.com
 DJI_LOCALE=en_US
-"""
-
-    ENV_FILE.write_text(env_content)
-    print_success(f".env file created: {ENV_FILE}")
+""")
 
-    # Create human-readable file
-    content = f"""
+CREDENTIALS_TEMPLATE = Template("""
 ================================================================================
                     DJI HOME CREDENTIALS
-                    Extracted on: {timestamp}
+                    Extracted on: $timestamp
 ================================================================================
 
 USER ACCOUNT
 ------------
-User Token:     {credentials.get('user_token', 'Not found')}
-User ID:        {credentials.get('user_id', 'Not found')}
-User Email:     {credentials.get('user_email', 'Not found')}
-User Name:      {credentials.get('user_name', 'Not found')}
-Device UUID:    {credentials.get('device_uuid', 'Not found')}
+User Token:     $user_token
+User ID:        $user_id
+User Email:     $user_email
+User Name:      $user_name
+Device UUID:    $device_uuid
 
 DEVICE
 ------
-Device SN:      {credentials.get('device_sn', 'Not found')}
-Pair UUID:      {credentials.get('pair_uuid', 'Not found')}
-IoT URL:        {credentials.get('iot_url', 'Not found')}
+Device SN:      $device_sn
+Pair UUID:      $pair_uuid
+IoT URL:        $iot_url
 
 MQTT
 ----
-Broker:         {credentials.get('mqtt_domain', 'crobot-mqtt-us.djigate.com')}
-Port:           {credentials.get('mqtt_port', 8883)}
-Username:       {credentials.get('mqtt_user_uuid', 'Obtained via API')}
+Broker:         $mqtt_domain
+Port:           $mqtt_port
+Username:       $mqtt_user_uuid
 Password:       Obtained dynamically via API (expires every ~4h)
 
 API ENDPOINT
@@ -703,28 +1633,84 @@ The .env file has been created automatically.
 Simply run: python3 dji_mqtt_client.py --subscribe
 
 ================================================================================
-"""
+""")
+
+# Values used for fields that were not extracted
+ENV_DEFAULTS = {"user_token": "", "user_id": "", "device_sn": ""}
+CREDENTIALS_DEFAULTS = {
+    **{field: "Not found" for field in (
+        "user_token", "user_id", "user_email", "user_name", "device_uuid", "device_sn", "pair_uuid", "iot_url",
+    )},
+    "mqtt_domain": "crobot-mqtt-us.djigate.com",
+    "mqtt_port": 8883,
+    "mqtt_user_uuid": "Obtained via API",
+}
+
+
+def save_credentials(credentials):
+    """Save credentials to file."""
+    print_step("5", "Saving credentials...")
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    OUTPUT_FILE.write_text(content)
+    # Create .env file for mqtt client
+    env_content = ENV_TEMPLATE.substitute({**ENV_DEFAULTS, **credentials, "timestamp": timestamp})
+    ENV_FILE.write_bytes(env_content.encode("utf-8"))
+    print_success(f".env file created: {ENV_FILE}")
+
+    # Create human-readable file
+    content = CREDENTIALS_TEMPLATE.substitute({**CREDENTIALS_DEFAULTS, **credentials, "timestamp": timestamp})
+    OUTPUT_FILE.write_bytes(content.encode("utf-8"))
     print_success(f"Credentials saved to: {OUTPUT_FILE}")
 
     return content
 
 
-def cleanup():
+def cleanup(keep_alive=False):
     """Cleanup emulator."""
     print_step("6", "Cleanup...")
 
-    response = input(f"{Colors.CYAN}Do you want to stop the emulator? (y/N): {Colors.END}")
+    if keep_alive:
+        print_info("Emulator is still running, the next run will reuse it")
+        return
 
-    if response.lower() in ['y', 'yes']:
-        run_command("adb emu kill", check=False)
+    if sys.stdin.isatty():
+        response = input(f"{Colors.CYAN}Do you want to stop the emulator? (y/N): {Colors.END}")
+        stop = response.lower() in ['y', 'yes']
+    else:
+        # Unattended run: nobody can answer, keep it running unless asked otherwise
+        stop = os.environ.get("DJI_AUTOSTOP") == "1"
+
+    if stop:
+        ADB_SHELL.close()
+        pid = _emulator_pid()
+        if pid:
+            # Signal the emulator directly instead of another adb round trip
+            os.kill(pid, signal.SIGTERM)
+            _wait_until(lambda: not _is_running(pid), 60, interval=0.5)
+        else:
+            run_command("adb emu kill", check=False)
+            run_command("adb wait-for-disconnect", check=False, timeout=60)
+        _adb_cached.cache_clear()
+        EMULATOR_PID_FILE.unlink(missing_ok=True)
         print_success("Emulator stopped")
     else:
         print_info("Emulator is still running")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract DJI Home credentials from an Android emulator.")
+    parser.add_argument(
+        "--keep-alive",
+        action="store_true",
+        help="leave the emulator running at the end so the next run can reuse it",
+    )
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+
     print_header("DJI HOME CREDENTIALS EXTRACTOR")
 
     print(f"""
@@ -740,25 +1726,35 @@ Prerequisites:
 The process takes about 5-10 minutes.{Colors.END}
 """)
 
-    input(f"{Colors.CYAN}>>> Press ENTER to start... {Colors.END}")
+    if sys.stdin.isatty():
+        input(f"{Colors.CYAN}>>> Press ENTER to start... {Colors.END}")
 
     try:
-        # Step 1: Setup environment
-        print_header("STEP 1: ENVIRONMENT SETUP")
+        # Reuse the emulator left running by a previous run (skips steps 1-2)
+        if find_running_emulator():
+            print_header("STEP 2: EMULATOR SETUP")
+            print_success("Reusing the emulator from the previous run")
+        else:
+            # Step 1: Setup environment
+            print_header("STEP 1: ENVIRONMENT SETUP")
 
-        check_android_studio_or_sdk()
-        check_homebrew()
-        check_java()
-        android_home, sdkmanager = setup_android_sdk()
+            # `java -version` starts a JVM: probe it in the background while the
+            # SDK and Homebrew are checked (those are plain file lookups)
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                pool.submit(_java_version)
+                check_android_studio_or_sdk()
+                check_homebrew()
+            check_java()
+            android_home, sdkmanager = setup_android_sdk()
 
-        # Step 2: Setup emulator
-        print_header("STEP 2: EMULATOR SETUP")
+            # Step 2: Setup emulator
+            print_header("STEP 2: EMULATOR SETUP")
 
-        create_avd(android_home, sdkmanager)
+            create_avd(android_home, sdkmanager)
 
-        if not start_emulator(android_home):
-            print_error("Could not start emulator")
-            sys.exit(1)
+            if not start_emulator(android_home):
+                print_error("Could not start emulator")
+                sys.exit(1)
 
         setup_root()
 
@@ -769,10 +1765,12 @@ The process takes about 5-10 minutes.{Colors.END}
             print_error("Could not install APK")
             sys.exit(1)
 
+        save_snapshot()
         launch_app()
 
         # Step 4: Wait for login and extract
-        wait_for_login()
+        if not wait_for_login():
+            sys.exit(1)
 
         credentials = extract_credentials()
 
@@ -787,7 +1785,7 @@ The process takes about 5-10 minutes.{Colors.END}
             sys.exit(1)
 
         # Step 5: Cleanup
-        cleanup()
+        cleanup(keep_alive=args.keep_alive)
 
         print_header("DONE!")
         print_success(f"Your credentials are in: {OUTPUT_FILE}")